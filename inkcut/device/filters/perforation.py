@@ -14,17 +14,645 @@ Splits continuous cutting paths into alternating cut and bridge segments
 for applications like sewing pattern cutting where pieces need to stay
 connected until removed.
 """
+import math
+import threading
+import traceback
+import numpy as np
+from functools import lru_cache
+from itertools import islice
 from atom.api import Float, Enum, Bool, Instance
 from inkcut.device.plugin import DeviceFilter, Model
-from inkcut.core.utils import unit_conversions
+from inkcut.core.utils import unit_conversions, log
 try:
-    from enaml.qt.QtGui import QPainterPath, QPolygonF
+    from enaml.qt.QtGui import QPolygonF
     from enaml.qt.QtCore import QPointF
 except ImportError:
     # Fallback in case of import issues
-    QPainterPath = None
     QPolygonF = None
     QPointF = None
+try:
+    # The kernels release the GIL so perforating from several threads
+    # runs in parallel, a polypath is already split over all cores by
+    # prange in `_perforate_all`
+    from numba import njit, prange, get_num_threads, typeof
+    HAS_NUMBA = True
+except ImportError:
+    # Numba is optional, without it the numpy implementation is used
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+#: Without numba the kernels run as plain Python. Their cost grows with
+#: the number of vertices and cuts while the numpy implementation has a
+#: fixed overhead of about as much as four cuts, so the kernels are only
+#: used on polylines with fewer vertices and cuts than these
+SMALL_POLYLINE = 20
+SMALL_CUT_COUNT = 4
+
+#: Cuts on paths no longer than one period indexed by start_with_cut and
+#: whether the path is longer than a cut. Each entry is the number of
+#: cuts and whether the cut stops a bridge length before the end of the
+#: path instead of after one cut length.
+SHORT_PATH_CUTS = (
+    # Starting with a bridge a path shorter than a cut is skipped
+    # entirely, a longer one gets one cut and the rest is bridge
+    ((0, False), (1, False)),
+    # Starting with a cut the whole path is cut but shortened to leave
+    # space for a bridge at the end. If the path is too short for that
+    # the cut is empty and dropped.
+    ((1, True), (1, False)),
+)
+
+#: Units the config can be displayed in
+_UNITS = tuple(unit_conversions.keys())
+
+
+def points_at(xs, ys, cum, seg_len, dx, dy, d):
+    """Find the points at the given distances along a polyline.
+
+    Parameters
+    ----------
+    xs, ys: numpy.ndarray
+        Vertex coordinates of the polyline
+    cum: numpy.ndarray
+        Distance of each vertex from the start of the polyline
+    seg_len, dx, dy: numpy.ndarray
+        Length and deltas of each line segment of the polyline
+    d: numpy.ndarray
+        Distances along the polyline
+
+    Returns
+    -------
+    points: numpy.ndarray
+        An (N, 2) array with the point at each distance
+
+    """
+    i = np.clip(np.searchsorted(cum, d, side='right') - 1, 0, len(seg_len) - 1)
+    t = np.divide(d - cum[i], seg_len[i], out=np.zeros(len(d)),
+                  where=seg_len[i] > 0)
+    return np.column_stack((xs[i] + t * dx[i], ys[i] + t * dy[i]))
+
+
+def extract_segments(xs, ys, cum, seg_len, dx, dy, starts, ends):
+    """Extract the parts of a polyline between pairs of distances. Each
+    part follows the polyline so any vertices strictly between the start
+    and end distance are kept.
+
+    Parameters
+    ----------
+    xs, ys, cum, seg_len, dx, dy: numpy.ndarray
+        Vertices and cumulative length table of the polyline as used by
+        `points_at`
+    starts, ends: numpy.ndarray
+        Start and end distance of each part
+
+    Returns
+    -------
+    points, offsets: numpy.ndarray
+        The parts packed as accepted by `to_polygons`
+
+    """
+    inner_start = np.searchsorted(cum, starts, side='right')
+    inner_end = np.searchsorted(cum, ends, side='left')
+    inner_counts = np.maximum(inner_end - inner_start, 0)
+    offsets = np.concatenate(([0], np.cumsum(inner_counts + 2)))
+
+    # Fill the start and end point of each part, everything in between is
+    # a vertex of the polyline
+    points = np.empty((offsets[-1], 2))
+    points[offsets[:-1]] = points_at(xs, ys, cum, seg_len, dx, dy, starts)
+    points[offsets[1:] - 1] = points_at(xs, ys, cum, seg_len, dx, dy, ends)
+    inner = np.ones(len(points), dtype=bool)
+    inner[offsets[:-1]] = False
+    inner[offsets[1:] - 1] = False
+    vertices = np.flatnonzero(inner) - np.repeat(
+        offsets[:-1] + 1 - inner_start, inner_counts)
+    points[inner, 0] = xs[vertices]
+    points[inner, 1] = ys[vertices]
+    return points, offsets
+
+
+def polygon_buffer(poly):
+    """Get a numpy view on the points of a QPolygonF.
+
+    The view is only valid as long as the polygon is alive and not
+    resized.
+
+    Parameters
+    ----------
+    poly: QPolygonF
+        The polygon to access
+
+    Returns
+    -------
+    points: numpy.ndarray or None
+        An (N, 2) array sharing memory with the polygon or None when the
+        Qt bindings don't expose the polygon memory
+
+    """
+    n = len(poly)
+    try:
+        data = poly.data()
+        data.setsize(2 * n * np.dtype(np.float64).itemsize)
+        return np.frombuffer(data, dtype=np.float64).reshape(n, 2)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def polygon_to_array(poly):
+    """Get the points of a QPolygonF as an (N, 2) array.
+
+    Where the Qt bindings expose the memory of the polygon the array is a
+    view on it so no Python object is created per point, see
+    `polygon_buffer`.
+
+    Parameters
+    ----------
+    poly: QPolygonF
+        The polygon to read
+
+    Returns
+    -------
+    points: numpy.ndarray
+        An (N, 2) array with the points of the polygon
+
+    """
+    points = polygon_buffer(poly)
+    if points is None:
+        n = len(poly)
+        points = np.fromiter((c for p in poly for c in (p.x(), p.y())),
+                             dtype=np.float64, count=2 * n).reshape(n, 2)
+    return points
+
+
+def to_polygons(points, offsets):
+    """Convert packed polyline points to a list of QPolygonF.
+
+    All points are copied into one preallocated polygon in a single step,
+    each polyline is then sliced out of it.
+
+    Parameters
+    ----------
+    points: numpy.ndarray
+        An (N, 2) array with the points of all polylines
+    offsets: numpy.ndarray
+        Index of the first point of each polyline followed by the total
+        number of points
+
+    Returns
+    -------
+    polygons: List of QPolygonF
+        A polygon for each polyline
+
+    """
+    offsets = offsets.tolist()
+    polygon = QPolygonF()
+    try:
+        polygon.resize(len(points))
+    except AttributeError:
+        polygon.fill(QPointF(), len(points))
+    buffer = polygon_buffer(polygon)
+    if buffer is None:
+        points = points.tolist()
+        return [
+            QPolygonF([QPointF(x, y) for x, y in points[start:end]])
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+    buffer[:] = points
+    return [
+        polygon.mid(start, end - start)
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+
+def to_arrays(points, offsets):
+    """Split packed polyline points into a list of arrays.
+
+    Parameters
+    ----------
+    points: numpy.ndarray
+        An (N, 2) array with the points of all polylines
+    offsets: numpy.ndarray
+        Index of the first point of each polyline followed by the total
+        number of points
+
+    Returns
+    -------
+    polylines: List of numpy.ndarray
+        An (N, 2) array for each polyline. These are views on a copy of
+        points so callers may modify them even when points is a cached
+        result shared between jobs.
+
+    """
+    points = points.copy()
+    offsets = offsets.tolist()
+    return [
+        points[start:end] for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+
+@njit(nogil=True, cache=True)
+def _interpolate(xy, cum, i, d):
+    """Point at distance d on the polyline segment starting at vertex i"""
+    seg_len = cum[i + 1] - cum[i]
+    t = (d - cum[i]) / seg_len if seg_len > 0 else 0.0
+    return (xy[i, 0] + t * (xy[i + 1, 0] - xy[i, 0]),
+            xy[i, 1] + t * (xy[i + 1, 1] - xy[i, 1]))
+
+
+@njit(nogil=True, cache=True)
+def _cut_schedule(total_length, cut_length, bridge_length, start_with_cut):
+    """Work out where the cuts along a path go. Cut i runs from
+    `offset + i * (cut_length + bridge_length)` for `cut_length` but is
+    clipped to end at `limit`, cuts starting at or after `limit` are
+    dropped.
+
+    Parameters
+    ----------
+    total_length: float
+        Length of the path
+    cut_length: float
+        Length of each cut segment
+    bridge_length: float
+        Length of each bridge segment
+    start_with_cut: bool
+        Whether the pattern starts with a cut or a bridge
+
+    Returns
+    -------
+    offset: float
+        Distance along the path the first cut starts at
+    count: int
+        Number of cuts
+    limit: float
+        Distance along the path no cut may go past
+
+    """
+    period = cut_length + bridge_length
+
+    if total_length <= period:
+        # Very short paths get at most one cut which must still leave
+        # the pen up at the end
+        bucket = 0 if total_length <= cut_length else 1
+        count, leave_bridge = SHORT_PATH_CUTS[int(start_with_cut)][bucket]
+        if leave_bridge:
+            return 0.0, count, total_length - bridge_length
+        return 0.0, count, cut_length
+
+    # BUGFIX: Pre-calculate pattern to ensure it always ends with a bridge (pen up)
+    # This prevents the pen from staying down after the last cut segment
+    effective_length = total_length
+
+    # Calculate how much space we need to reserve for a final bridge
+    # to ensure the pattern always ends with pen up. The phase the
+    # normal pattern ends in follows from where the path ends
+    # within the last period: with a leading cut the cut covers
+    # (0, cut] of each period, with a leading bridge it covers
+    # (bridge, period] where 0 is the end of the previous period.
+    remainder = total_length % period
+    if start_with_cut:
+        final_is_cutting = 0 < remainder <= cut_length
+    else:
+        final_is_cutting = remainder == 0 or remainder > bridge_length
+
+    # If the pattern would end with cutting, reserve space for a final bridge
+    if final_is_cutting and total_length > bridge_length:
+        effective_length = total_length - bridge_length
+
+    offset = 0.0 if start_with_cut else bridge_length
+    return offset, int(math.ceil(effective_length / period)), effective_length
+
+
+@njit(nogil=True, cache=True)
+def _walk(xy, cum, cut_length, bridge_length, start_with_cut, points,
+          offsets, k, count, write):
+    """Walk the cut pattern along a polyline.
+
+    Parameters
+    ----------
+    xy: numpy.ndarray
+        An (N, 2) array with the vertices of the polyline to perforate
+    cum: numpy.ndarray
+        Distance of each vertex from the start of the polyline
+    cut_length: float
+        Length of each cut segment
+    bridge_length: float
+        Length of each bridge segment
+    start_with_cut: bool
+        Whether the pattern starts with a cut or a bridge
+    points, offsets: numpy.ndarray
+        Packed output the cuts are written to
+    k, count: int
+        Index in points and offsets to start writing at
+    write: bool
+        If False the cuts are only counted and nothing is written
+
+    Returns
+    -------
+    k, count: int
+        Index in points and offsets after the last cut
+
+    """
+    n = len(xy)
+    period = cut_length + bridge_length
+    offset, cut_count, limit = _cut_schedule(
+        cum[n - 1], cut_length, bridge_length, start_with_cut)
+
+    # Look up the segments each cut starts and ends on with a binary
+    # search, tessellated curves have far more vertices than cuts so
+    # this beats walking every vertex
+    for c in range(cut_count):
+        start = offset + c * period
+        end = min(start + cut_length, limit)
+        if end <= start:
+            break
+        first = np.searchsorted(cum, start, side='right')
+        last = np.searchsorted(cum, end, side='left')
+        if write:
+            points[k, 0], points[k, 1] = _interpolate(
+                xy, cum, min(first - 1, n - 2), start)
+        k += 1
+        for i in range(first, last):
+            if write:
+                points[k, 0] = xy[i, 0]
+                points[k, 1] = xy[i, 1]
+            k += 1
+        if write:
+            j = min(np.searchsorted(cum, end, side='right') - 1, n - 2)
+            points[k, 0], points[k, 1] = _interpolate(xy, cum, j, end)
+        k += 1
+        count += 1
+        if write:
+            offsets[count] = k
+
+    return k, count
+
+
+@njit(nogil=True, cache=True)
+def _cumulative_lengths(xy, cum):
+    """Fill cum with the distance of each vertex from the polyline start"""
+    cum[0] = 0.0
+    for i in range(1, len(xy)):
+        cum[i] = cum[i - 1] + math.hypot(xy[i, 0] - xy[i - 1, 0],
+                                         xy[i, 1] - xy[i - 1, 1])
+
+
+@njit(nogil=True, cache=True)
+def _perforate(xy, cut_length, bridge_length, start_with_cut):
+    """Compiled version of `perforate_polyline`.
+
+    Parameters
+    ----------
+    xy: numpy.ndarray
+        An (N, 2) array with the vertices of the polyline to perforate
+    cut_length: float
+        Length of each cut segment
+    bridge_length: float
+        Length of each bridge segment
+    start_with_cut: bool
+        Whether the pattern starts with a cut or a bridge
+
+    Returns
+    -------
+    points, offsets: numpy.ndarray
+        The cuts packed as accepted by `to_polygons`
+
+    """
+    cum = np.empty(len(xy))
+    _cumulative_lengths(xy, cum)
+    k, count = _walk(xy, cum, cut_length, bridge_length, start_with_cut,
+                     np.empty((0, 2)), np.empty(1, np.int64), 0, 0, False)
+    points = np.empty((k, 2))
+    offsets = np.empty(count + 1, np.int64)
+    offsets[0] = 0
+    _walk(xy, cum, cut_length, bridge_length, start_with_cut, points,
+          offsets, 0, 0, True)
+    return points, offsets
+
+
+@njit(nogil=True, parallel=True, cache=True)
+def _perforate_all(xy, polygon_offsets, cut_length, bridge_length,
+                   start_with_cut):
+    """Perforate many polylines packed in one array in a single call.
+
+    Parameters
+    ----------
+    xy: numpy.ndarray
+        An (N, 2) array with the vertices of all polylines
+    polygon_offsets: numpy.ndarray
+        Index of the first vertex of each polyline followed by the total
+        number of vertices
+    cut_length: float
+        Length of each cut segment
+    bridge_length: float
+        Length of each bridge segment
+    start_with_cut: bool
+        Whether the pattern starts with a cut or a bridge
+
+    Returns
+    -------
+    points, offsets: numpy.ndarray
+        The cuts of all polylines packed as accepted by `to_polygons`
+    cuts: numpy.ndarray
+        Index of the first cut of each polyline followed by the total
+        number of cuts
+
+    """
+    n = len(polygon_offsets) - 1
+    cum = np.empty(len(xy))
+    point_counts = np.zeros(n + 1, np.int64)
+    cut_counts = np.zeros(n + 1, np.int64)
+
+    # Count the output of each polyline first so every polyline knows
+    # where to write its cuts
+    for p in prange(n):
+        start, end = polygon_offsets[p], polygon_offsets[p + 1]
+        _cumulative_lengths(xy[start:end], cum[start:end])
+        point_counts[p + 1], cut_counts[p + 1] = _walk(
+            xy[start:end], cum[start:end], cut_length, bridge_length,
+            start_with_cut, np.empty((0, 2)), np.empty(1, np.int64), 0, 0,
+            False)
+
+    point_counts = np.cumsum(point_counts)
+    cuts = np.cumsum(cut_counts)
+    points = np.empty((point_counts[n], 2))
+    offsets = np.empty(cuts[n] + 1, np.int64)
+    offsets[0] = 0
+    for p in prange(n):
+        start, end = polygon_offsets[p], polygon_offsets[p + 1]
+        _walk(xy[start:end], cum[start:end], cut_length, bridge_length,
+              start_with_cut, points, offsets, point_counts[p], cuts[p], True)
+    return points, offsets, cuts
+
+
+def perforate_polyline(xy, cut_length, bridge_length, start_with_cut):
+    """Numpy version of `_perforate` used when numba is not available.
+
+    Parameters
+    ----------
+    xy: numpy.ndarray
+        An (N, 2) array with the vertices of the polyline to perforate
+    cut_length: float
+        Length of each cut segment
+    bridge_length: float
+        Length of each bridge segment
+    start_with_cut: bool
+        Whether the pattern starts with a cut or a bridge
+
+    Returns
+    -------
+    points, offsets: numpy.ndarray
+        The cuts packed as accepted by `to_polygons`
+
+    """
+    # Build a cumulative length table over the polyline once so
+    # looking up a point at a given distance is a binary search
+    # instead of a walk over the whole path
+    xs = xy[:, 0]
+    ys = xy[:, 1]
+    dx = np.diff(xs)
+    dy = np.diff(ys)
+    seg_len = np.hypot(dx, dy)
+    cum = np.concatenate(([0.0], np.cumsum(seg_len)))
+    table = (xs, ys, cum, seg_len, dx, dy)
+
+    # Generate every cut in one go, each period is a cut followed
+    # by a bridge (or the other way around) and cuts running past
+    # the end of the pattern are clipped or dropped
+    offset, count, limit = _cut_schedule(
+        float(cum[-1]), cut_length, bridge_length, start_with_cut)
+    starts = np.arange(count) * (cut_length + bridge_length) + offset
+    ends = np.minimum(starts + cut_length, limit)
+    mask = ends > starts
+    return extract_segments(*table, starts[mask], ends[mask])
+
+
+def _implementation(xy, cut_length, bridge_length):
+    """Pick the implementation to perforate the polyline xy with"""
+    if HAS_NUMBA:
+        return _perforate
+    if len(xy) < SMALL_POLYLINE:
+        points = xy.tolist()
+        length = sum(math.hypot(x1 - x0, y1 - y0)
+                     for (x0, y0), (x1, y1) in zip(points, points[1:]))
+        if length < SMALL_CUT_COUNT * (cut_length + bridge_length):
+            return _perforate
+    return perforate_polyline
+
+
+def perforate_polypath(xy, polygon_offsets, cut_length, bridge_length,
+                       start_with_cut):
+    """Perforate polylines packed in one array. Results are cached so
+    running the same job again, for example after a test run, doesn't
+    repeat the work.
+
+    Parameters
+    ----------
+    xy: numpy.ndarray
+        An (N, 2) array with the vertices of all polylines
+    polygon_offsets: numpy.ndarray
+        Index of the first vertex of each polyline followed by the total
+        number of vertices
+    cut_length: float
+        Length of each cut segment
+    bridge_length: float
+        Length of each bridge segment
+    start_with_cut: bool
+        Whether the pattern starts with a cut or a bridge
+
+    Returns
+    -------
+    points, offsets: numpy.ndarray
+        The cuts of all polylines packed as accepted by `to_polygons`
+    cuts: numpy.ndarray
+        Index of the first cut of each polyline followed by the total
+        number of cuts
+
+    """
+    return _perforate_polypath(
+        np.ascontiguousarray(xy, dtype=np.float64).tobytes(),
+        np.asarray(polygon_offsets, dtype=np.int64).tobytes(),
+        float(cut_length), float(bridge_length), bool(start_with_cut))
+
+
+@lru_cache(maxsize=2)
+def _perforate_polypath(xy, polygon_offsets, cut_length, bridge_length,
+                        start_with_cut):
+    """Cached part of `perforate_polypath`, the arrays are passed as bytes
+    so they can be used as the cache key. The key holds a copy of all
+    vertices of the job so only the last couple of jobs are kept.
+
+    """
+    xy = np.frombuffer(xy, dtype=np.float64).reshape(-1, 2)
+    polygon_offsets = np.frombuffer(polygon_offsets, dtype=np.int64)
+    if HAS_NUMBA:
+        result = _perforate_all(xy, polygon_offsets, cut_length,
+                                bridge_length, start_with_cut)
+    else:
+        parts = []
+        for start, end in zip(polygon_offsets[:-1], polygon_offsets[1:]):
+            polyline = xy[start:end]
+            perforate = _implementation(polyline, cut_length, bridge_length)
+            parts.append(perforate(polyline, cut_length, bridge_length,
+                                   start_with_cut))
+        point_counts = np.cumsum([0] + [len(points) for points, _ in parts])
+        points = np.concatenate(
+            [points for points, _ in parts] or [np.empty((0, 2))])
+        offsets = np.concatenate(
+            [[0]] + [offsets[1:] + base
+                     for (_, offsets), base in zip(parts, point_counts)])
+        cuts = np.cumsum([0] + [len(offsets) - 1 for _, offsets in parts])
+        result = (points, offsets, cuts)
+
+    # The same arrays are returned to every caller
+    for a in result:
+        a.setflags(write=False)
+    return result
+
+
+#: Thread compiling the kernels, see `warm_up`
+_warm_up_thread = None
+
+
+def warm_up():
+    """Compile the numba kernels in a background thread. Compiling takes
+    a few seconds the first time (and every time if numba can't write its
+    cache) which would otherwise block processing the first job. A job
+    started while the kernels are still compiling waits for them instead
+    of compiling them again.
+
+    """
+    global _warm_up_thread
+    if not HAS_NUMBA or _warm_up_thread is not None:
+        return
+    # Compiling the parallel kernel starts numba's thread pool if it isn't
+    # running yet, started from another thread it keeps the process from
+    # exiting
+    get_num_threads()
+    _warm_up_thread = threading.Thread(
+        target=_compile_kernels, name="perforation-warm-up", daemon=True)
+    _warm_up_thread.start()
+
+
+def _compile_kernels():
+    """Compile the kernels for the argument types jobs pass them"""
+    try:
+        xy = np.array([[0.0, 0.0], [1.0, 0.0]])
+        offsets = np.array([0, len(xy)], dtype=np.int64)
+        # Jobs read the packed arrays back from bytes, see
+        # `_perforate_polypath`
+        args = (np.frombuffer(xy.tobytes()).reshape(-1, 2),
+                np.frombuffer(offsets.tobytes(), dtype=np.int64),
+                1.0, 1.0, True)
+        _perforate_all.compile(tuple(typeof(a) for a in args))
+        if QPolygonF is not None:
+            poly = QPolygonF([QPointF(x, y) for x, y in xy])
+            _perforate(polygon_to_array(poly), 1.0, 1.0, True)
+    except Exception:
+        log.warning("perforation | Failed to compile kernels: {}".format(
+            traceback.format_exc()))
 
 
 class PerforationConfig(Model):
@@ -38,7 +666,7 @@ class PerforationConfig(Model):
     start_with_cut = Bool(True).tag(config=True)
     
     #: Units for display 
-    units = Enum(*unit_conversions.keys()).tag(config=True)
+    units = Enum(*_UNITS).tag(config=True)
     
     def _default_units(self):
         return 'mm'
@@ -55,6 +683,10 @@ class PerforationFilter(DeviceFilter):
     
     #: Configuration
     config = Instance(PerforationConfig, ()).tag(config=True)
+
+    def __init__(self, *args, **kwargs):
+        super(PerforationFilter, self).__init__(*args, **kwargs)
+        warm_up()
     
     def apply_to_polypath(self, polypath):
         """ Apply perforation to the polypath by splitting each polygon
@@ -70,41 +702,84 @@ class PerforationFilter(DeviceFilter):
         polypath: List of QPolygonF
             List of polygons with perforation applied - will contain
             more polygons as continuous paths are split into segments
+        """
+        return self._apply(polypath, to_polygons)
+
+    def apply_to_polypath_arrays(self, polypath):
+        """ Same as `apply_to_polypath` but each cut is returned as an
+        (N, 2) array of points instead of a QPolygonF.
+        
+        Parameters
+        ----------
+        polypath: List of QPolygonF
+            List of polygons to process
+        
+        Returns
+        -------
+        polypath: List of numpy.ndarray or QPolygonF
+            List of cuts. Polygons which are left unchanged are returned
+            as they are. The arrays are writable and not shared with
+            other runs.
+        """
+        return self._apply(polypath, to_arrays)
+
+    def _apply(self, polypath, convert):
+        """ Perforate the polypath and convert the packed cuts with the
+        given function, either `to_polygons` or `to_arrays`.
+        
         """
         # Safety check for Qt imports
-        if QPainterPath is None or QPolygonF is None:
+        if QPolygonF is None:
             return polypath
             
         cut_length = self.config.cut_length
         bridge_length = self.config.bridge_length
+        start_with_cut = self.config.start_with_cut
         
-        # If both lengths are 0 or negative, return unchanged
-        if cut_length <= 0 and bridge_length <= 0:
-            return polypath
-            
-        # If only cut length is set, don't perforate (continuous cut)
-        if bridge_length <= 0:
+        # Without both a cut and a bridge there is no pattern to apply
+        # and the path is cut continuously
+        if cut_length <= 0 or bridge_length <= 0:
             return polypath
             
         result = []
         
         try:
-            for poly in polypath:
-                if len(poly) < 2:
+            # Pack all polygons into one array and perforate them in a
+            # single call. Polygons with all points in the same spot have
+            # no length to cut and are left out.
+            has_length = [
+                len(poly) >= 2 and not poly.boundingRect().isNull()
+                for poly in polypath
+            ]
+            polygons = [
+                poly for poly, keep in zip(polypath, has_length) if keep
+            ]
+            xy = np.concatenate(
+                [polygon_to_array(poly) for poly in polygons] or
+                [np.empty((0, 2))])
+            polygon_offsets = np.cumsum(
+                [0] + [len(poly) for poly in polygons])
+            points, offsets, cuts = perforate_polypath(
+                xy, polygon_offsets, cut_length, bridge_length,
+                start_with_cut)
+            segments = iter(convert(points, offsets))
+            cut_counts = iter(np.diff(cuts).tolist())
+            for poly, keep in zip(polypath, has_length):
+                if keep:
+                    result.extend(islice(segments, next(cut_counts)))
+                elif len(poly) < 2:
                     # Skip polygons with insufficient points
                     result.append(poly)
-                    continue
-                    
-                # Apply perforation to this polygon
-                perforated_segments = self.apply_perforation(poly, cut_length, bridge_length)
-                result.extend(perforated_segments)
         except Exception:
             # If anything goes wrong, return original polypath
+            log.error("perforation | Failed to perforate polypath: {}".format(
+                traceback.format_exc()))
             return polypath
         
         return result
     
-    def apply_perforation(self, poly, cut_length, bridge_length):
+    def apply_perforation(self, poly, cut_length, bridge_length,
+                          start_with_cut):
         """Apply perforation to a single polygon by splitting it into
         alternating cut and bridge segments.
         
@@ -116,6 +791,8 @@ class PerforationFilter(DeviceFilter):
             Length of each cut segment
         bridge_length: float
             Length of each bridge segment
+        start_with_cut: bool
+            Whether the pattern starts with a cut or a bridge
             
         Returns
         -------
@@ -123,137 +800,21 @@ class PerforationFilter(DeviceFilter):
             List of polygon segments representing the cuts
             (bridges are omitted - they become pen-up moves)
         """
-        if len(poly) < 2 or QPainterPath is None:
+        if len(poly) < 2 or QPolygonF is None:
             return [poly]
-            
-        try:
-            # Convert polygon to QPainterPath to use length calculations
-            path = QPainterPath()
-            path.moveTo(poly[0])
-            for i in range(1, len(poly)):
-                path.lineTo(poly[i])
-                
-            # If path is too short to perforate meaningfully, handle specially
-            total_length = path.length()
-            segment_length = cut_length + bridge_length
-
-            if total_length <= segment_length:
-                # For very short paths, still need to ensure pen ends up
-                # Check if we should cut this short path or skip it entirely
-                if total_length <= cut_length:
-                    # Path is shorter than cut length
-                    if self.config.start_with_cut:
-                        # Cut the whole path, but add a minimal bridge at the end
-                        if total_length > bridge_length:
-                            # Shorten the cut to leave space for a bridge
-                            cut_end = total_length - bridge_length
-                            if cut_end > 0:
-                                shortened_poly = self.extract_path_segment(path, 0, cut_end)
-                                return [shortened_poly] if shortened_poly else []
-                        # Path too short to safely perforate, skip it
-                        return []
-                    else:
-                        # Start with bridge, so skip this entire short path
-                        return []
-                else:
-                    # Path is longer than cut length but shorter than full segment
-                    # Apply one cut and leave the rest as bridge
-                    cut_segment = self.extract_path_segment(path, 0, cut_length)
-                    return [cut_segment] if cut_segment else []
-                
-            segments = []
-            current_distance = 0.0
-            is_cutting = self.config.start_with_cut
-
-            # BUGFIX: Pre-calculate pattern to ensure it always ends with a bridge (pen up)
-            # This prevents the pen from staying down after the last cut segment
-            effective_length = total_length
-
-            # Calculate how much space we need to reserve for a final bridge
-            # to ensure the pattern always ends with pen up
-            if total_length > segment_length:
-                # Calculate what the final state would be with the normal pattern
-                remaining_length = total_length
-                final_is_cutting = self.config.start_with_cut
-
-                while remaining_length > 0:
-                    if final_is_cutting:
-                        remaining_length -= min(cut_length, remaining_length)
-                    else:
-                        remaining_length -= min(bridge_length, remaining_length)
-
-                    if remaining_length <= 0:
-                        break
-
-                    final_is_cutting = not final_is_cutting
-
-                # If the pattern would end with cutting, reserve space for a final bridge
-                if final_is_cutting and total_length > bridge_length:
-                    effective_length = total_length - bridge_length
-
-            while current_distance < effective_length:
-                if is_cutting:
-                    # Create a cut segment
-                    segment_start = current_distance
-                    segment_end = min(current_distance + cut_length, effective_length)
-
-                    if segment_end > segment_start:
-                        cut_segment = self.extract_path_segment(path, segment_start, segment_end)
-                        if cut_segment and len(cut_segment) >= 2:
-                            segments.append(cut_segment)
-
-                    current_distance = segment_end
-                else:
-                    # Skip bridge segment (pen up)
-                    current_distance = min(current_distance + bridge_length, effective_length)
-
-                # Toggle between cutting and bridging
-                is_cutting = not is_cutting
-
-            return segments if segments else [poly]
-        except Exception:
-            # If anything goes wrong, return original polygon
+
+        # Without both a cut and a bridge the path is cut continuously
+        if cut_length <= 0 or bridge_length <= 0:
             return [poly]
-    
-    def extract_path_segment(self, path, start_distance, end_distance):
-        """Extract a segment of the path between two distance points.
-        
-        Parameters
-        ----------
-        path: QPainterPath
-            The source path
-        start_distance: float
-            Starting distance along the path
-        end_distance: float
-            Ending distance along the path
-            
-        Returns
-        -------
-        segment: QPolygonF or None
-            Polygon representing the path segment
-        """
-        if QPolygonF is None or start_distance >= end_distance:
-            return None
-            
-        try:
-            total_length = path.length()
-            if start_distance >= total_length:
-                return None
-                
-            # Convert distances to percentages
-            start_percent = start_distance / total_length
-            end_percent = min(end_distance / total_length, 1.0)
-            
-            # Get start and end points
-            start_point = path.pointAtPercent(start_percent)
-            end_point = path.pointAtPercent(end_percent)
-            
-            # For now, create a simple line segment
-            # TODO: This could be enhanced to follow the exact path curve
-            segment = QPolygonF()
-            segment.append(start_point)
-            segment.append(end_point)
-            
-            return segment
-        except Exception:
-            return None
\ No newline at end of file
+
+        # The bounding box diagonal is a lower bound of the path length so
+        # it can only rule out paths without any length, these never get
+        # a cut
+        if poly.boundingRect().isNull():
+            return []
+
+        xy = polygon_to_array(poly)
+        cut_length, bridge_length = float(cut_length), float(bridge_length)
+        points, offsets = _implementation(xy, cut_length, bridge_length)(
+            xy, cut_length, bridge_length, bool(start_with_cut))
+        return to_polygons(points, offsets)
@@ -11,6 +11,7 @@ Created on Jan 16, 2015
 @author: jrm
 """
 import enaml
+import math
 import traceback
 from atom.api import (
     Typed, List, Instance, ForwardInstance, ContainerList, Bool, Str,
@@ -261,6 +262,27 @@ class DeviceFilter(Model):
         """
         return polypath
 
+    def apply_to_polypath_arrays(self, polypath):
+        """ Apply the filter to the model when it is the last filter
+        before the path is sent to the device. Filters may return (N, 2)
+        arrays of points instead of QPolygons here to avoid creating Qt
+        objects no other filter will use.
+
+        Parameters
+        ----------
+        polypath: List of QPolygon
+            List of polygons to process
+
+        Returns
+        -------
+        polypath: List of QPolygon or numpy.ndarray
+            List of polygons with the filter applied. Like the polygons
+            returned by `apply_to_polypath` the arrays belong to the caller
+            and may be modified.
+
+        """
+        return self.apply_to_polypath(polypath)
+
 
 class DeviceConfig(Model):
     """ The default device configuration. Custom devices may want to subclass
@@ -912,7 +934,7 @@ class Device(Model):
         config = self.config
 
         # Previous point
-        _p = QtCore.QPointF(self.origin[0], self.origin[1])
+        _p = (self.origin[0], self.origin[1])
 
         # Do a final translation since Qt's y axis is reversed from svg's
         # It should now be a bbox of (x=0, y=0, width, height)
@@ -951,39 +973,49 @@ class Device(Model):
                     1/config.quality_factor, 1/config.quality_factor)
                 polypath = list(map(m_inv.map, polypath))
 
-            # Apply device filters to polypath
-            for f in self.filters:
+            # Apply device filters to polypath, the last one may return
+            # plain arrays of points
+            for i, f in enumerate(self.filters):
                 log.debug(" filter | Running {} on polypath".format(f))
-                polypath = f.apply_to_polypath(polypath)
+                if i == len(self.filters) - 1:
+                    polypath = f.apply_to_polypath_arrays(polypath)
+                else:
+                    polypath = f.apply_to_polypath(polypath)
 
             for path in polypath:
+                #: Work with plain coordinates, the last filter may have
+                #: returned arrays instead of polygons
+                if isinstance(path, QtGui.QPolygonF):
+                    path = [(p.x(), p.y()) for p in path]
+                else:
+                    path = path.tolist()
 
                 #: And then each point within the path
                 #: this is a polygon
-                for i, p in enumerate(path):
+                for i, (x, y) in enumerate(path):
 
                     #: Head state
                     # 0 move, 1 cut
                     z = 0 if i == 0 else 1
 
-                    #: Make a subpath
-                    subpath = QtGui.QPainterPath()
-                    subpath.moveTo(_p)
-                    subpath.lineTo(p)
+                    #: Length of the line from the last point
+                    px, py = _p
+                    l = math.hypot(x - px, y - py)
 
                     #: Update the last point
-                    _p = p
-
-                    #: Total length
-                    l = subpath.length()
+                    _p = (x, y)
 
                     #: If the device does not support streaming
                     #: the path interpolation is skipped entirely
                     if skip_interpolation:
-                        x, y = p.x(), p.y()
                         yield (l, self.move, ([x, y, z],), {})
                         continue
 
+                    #: Make a subpath
+                    subpath = QtGui.QPainterPath()
+                    subpath.moveTo(px, py)
+                    subpath.lineTo(x, y)
+
                     #: Where we are within the subpath
                     d = 0
 
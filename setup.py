@@ -18,6 +18,7 @@ install_requires = [
     'twisted',
     'enamlx>=0.4.2',
     'pyqtgraph',
+    'numpy',
     'qtconsole',  # now optional
     'pyserial>=3.5',
     'jsonpickle',
@@ -65,9 +66,12 @@ setup(
         'console_scripts': ['inkcut = inkcut.app:main'],
     },
     install_requires=install_requires,
-    #extras_require={
-    #    # IPython console plugin
-    #    'console':  ["qtconsole"],
-    #}
+    extras_require={
+        # IPython console plugin
+        #'console':  ["qtconsole"],
+
+        # Compiled kernels for the perforation filter
+        'perforation': ["numba"],
+    }
 
 )
@@ -9,15 +9,18 @@ Created on Nov 3, 2022
 
 @author: karliss
 """
+import numpy as np
 import pytest
 from pytest import approx
-from enaml.qt.QtGui import QVector2D
+from enaml.qt.QtGui import QVector2D, QPolygonF, QPainterPath
+from enaml.qt.QtCore import QPointF
 from glob import glob
 
 from inkcut.core.svg import QtSvgDoc
 from inkcut.core.api import to_unit, from_unit
 import inkcut.device.filters.blade_offset as blade_offset
 import inkcut.device.filters.min_line as min_line
+import inkcut.device.filters.perforation as perforation
 import inkcut.core.utils as utils
 import inkcut.job.models
 
@@ -166,3 +169,184 @@ def test_min_path():
     result = minline_filter.apply_to_model(doc, None)
 
     assert len(utils.split_painter_path(result)) == 0
+
+
+def make_polygon(points):
+    return QPolygonF([QPointF(x, y) for x, y in points])
+
+
+def polygon_points(poly):
+    return [(p.x(), p.y()) for p in poly]
+
+
+def perforate(points, cut_length, bridge_length, start_with_cut=True):
+    config = perforation.PerforationConfig()
+    config.cut_length = cut_length
+    config.bridge_length = bridge_length
+    config.start_with_cut = start_with_cut
+    perforation_filter = perforation.PerforationFilter(config=config)
+    result = perforation_filter.apply_to_polypath([make_polygon(points)])
+    return [polygon_points(poly) for poly in result]
+
+
+def test_perforation_follows_path():
+    """Cuts running over a corner must keep the corner vertex"""
+    result = perforate([(0, 0), (10, 0), (10, 10)], 6, 2)
+    assert result == [
+        [(0, 0), (6, 0)],
+        [(8, 0), (10, 0), (10, 4)],
+        # The last cut is shortened to leave a bridge at the end
+        [(10, 6), (10, 8)],
+    ]
+
+
+perforation_short_testdata = [
+    # (length, start_with_cut, expected cuts)
+    (4, True, [[(0, 0), (2, 0)]]),
+    (4, False, []),
+    (1, True, []),
+    (0, True, []),
+    (6, True, [[(0, 0), (5, 0)]]),
+    (6, False, [[(0, 0), (5, 0)]]),
+]
+
+
+@pytest.mark.parametrize("length,start_with_cut,expected",
+                         perforation_short_testdata)
+def test_perforation_short_path(length, start_with_cut, expected):
+    result = perforate([(0, 0), (length, 0)], 5, 2, start_with_cut)
+    assert result == expected
+
+
+perforation_implementations = [
+    perforation.perforate_polyline,
+    perforation._perforate,
+    # The compiled kernels run as plain Python when numba is missing
+    getattr(perforation._perforate, "py_func", perforation._perforate),
+]
+
+perforation_polylines = [
+    [(0, 0), (10, 0), (10, 10)],
+    [(0, 0), (3, 0), (3, 0), (3, 4), (0, 4), (0, 0)],
+    [(0, 0), (0.5, 0.5), (1, 0), (1.5, 0.5), (2, 0), (30, 1)],
+    [(0, 0), (7, 0)],
+    [(0, 0), (4, 0)],
+    [(0, 0), (0, 0)],
+]
+
+
+@pytest.mark.parametrize("start_with_cut", [True, False])
+@pytest.mark.parametrize("points", perforation_polylines)
+@pytest.mark.parametrize("implementation", perforation_implementations)
+def test_perforation_implementations(implementation, points, start_with_cut):
+    """All implementations of the cut walk must produce the same cuts"""
+    xy = np.array(points, dtype=float)
+    for cut_length, bridge_length in [(5.0, 2.0), (2.0, 1.0), (1.0, 0.5)]:
+        expected = perforation.perforate_polyline(
+            xy, cut_length, bridge_length, start_with_cut)
+        result = implementation(xy, cut_length, bridge_length,
+                                start_with_cut)
+        assert result[1].tolist() == expected[1].tolist()
+        assert result[0].ravel().tolist() == \
+            approx(expected[0].ravel().tolist())
+
+
+@pytest.mark.parametrize("length", [4, 6, 27])
+def test_perforation_int_lengths(length):
+    perforation_filter = perforation.PerforationFilter()
+    poly = make_polygon([(0, 0), (length, 0)])
+    result = perforation_filter.apply_perforation(poly, 5, 2, True)
+    expected = perforation_filter.apply_perforation(poly, 5.0, 2.0, True)
+    assert [polygon_points(p) for p in result] == \
+        [polygon_points(p) for p in expected]
+    assert result
+
+
+@pytest.mark.parametrize("start_with_cut", [True, False])
+@pytest.mark.parametrize("length", [20, 21, 24, 26, 27.5])
+def test_perforation_ends_with_bridge(length, start_with_cut):
+    result = perforate([(0, 0), (length, 0)], 5, 2, start_with_cut)
+    assert result
+    for cut in result:
+        (x0, _), (x1, _) = cut
+        assert x1 - x0 == approx(5) or x1 == approx(length - 2)
+    # The pen must be lifted before the end of the path
+    assert result[-1][-1][0] < length
+
+
+@pytest.mark.skipif(not perforation.HAS_NUMBA, reason="numba is missing")
+def test_perforation_warm_up():
+    """Creating the filter compiles the kernels in the background"""
+    perforation.PerforationFilter()
+    perforation._warm_up_thread.join()
+    assert perforation._perforate_all.signatures
+    assert perforation._perforate.signatures
+
+
+def test_perforation_repeated_run():
+    """Running the same job again must not share polygons with the
+    previous run as later filters may modify them in place"""
+    config = perforation.PerforationConfig(cut_length=5, bridge_length=2)
+    perforation_filter = perforation.PerforationFilter(config=config)
+    polypath = [make_polygon([(0, 0), (30, 0), (30, 30)])]
+    first = perforation_filter.apply_to_polypath(polypath)
+    expected = [polygon_points(poly) for poly in first]
+    first[0].append(QPointF(100, 100))
+    second = perforation_filter.apply_to_polypath(polypath)
+    assert [polygon_points(poly) for poly in second] == expected
+
+
+def test_perforation_cache_hit():
+    config = perforation.PerforationConfig(cut_length=5, bridge_length=2)
+    perforation_filter = perforation.PerforationFilter(config=config)
+    polypath = [make_polygon([(0, 0), (40, 0), (40, 40)])]
+    perforation._perforate_polypath.cache_clear()
+    first = perforation_filter.apply_to_polypath(polypath)
+    second = perforation_filter.apply_to_polypath(polypath)
+    info = perforation._perforate_polypath.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert [polygon_points(p) for p in second] == \
+        [polygon_points(p) for p in first]
+
+
+def test_perforation_arrays_match_polygons():
+    config = perforation.PerforationConfig(cut_length=5, bridge_length=2)
+    perforation_filter = perforation.PerforationFilter(config=config)
+    polypath = [make_polygon([(0, 0), (30, 0), (30, 30)]),
+                make_polygon([(50, 50)])]
+    polygons = perforation_filter.apply_to_polypath(polypath)
+    arrays = perforation_filter.apply_to_polypath_arrays(polypath)
+    assert len(arrays) == len(polygons)
+    for poly, path in zip(polygons, arrays):
+        if isinstance(path, QPolygonF):
+            path = polygon_points(path)
+        else:
+            path = [tuple(p) for p in path.tolist()]
+        assert path == polygon_points(poly)
+
+
+def test_perforation_arrays_not_shared():
+    """Arrays built from a cached result must not share memory"""
+    config = perforation.PerforationConfig(cut_length=5, bridge_length=2)
+    perforation_filter = perforation.PerforationFilter(config=config)
+    polypath = [make_polygon([(0, 0), (30, 0), (30, 30)])]
+    first = perforation_filter.apply_to_polypath_arrays(polypath)
+    expected = [path.tolist() for path in first]
+    first[0][:] = 100
+    second = perforation_filter.apply_to_polypath_arrays(polypath)
+    assert [path.tolist() for path in second] == expected
+
+
+def test_perforation_device_process(test_device):
+    """The device sends the cuts returned as arrays by the last filter"""
+    config = perforation.PerforationConfig(cut_length=5, bridge_length=2)
+    test_device.filters = [perforation.PerforationFilter(config=config)]
+    try:
+        path = QPainterPath()
+        path.moveTo(0, 0)
+        path.lineTo(16, 0)
+        moves = [args[0] for _, _, args, _ in test_device.process(path)]
+    finally:
+        test_device.filters = []
+    assert [(x, abs(y), z) for x, y, z in moves] == [
+        (0, 0, 0), (5, 0, 1), (7, 0, 0), (12, 0, 1), (16, 0, 0)]